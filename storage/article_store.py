@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Lazy mmap-backed Article Store
+
+Splits the knowledge base into three files sharing a prefix:
+
+    <prefix>.npy        normalized embeddings, searched via mmap
+    <prefix>.text       every article field as one contiguous UTF-8 blob
+    <prefix>.offsets.npy  int64 byte offsets into the blob
+
+Opening a store only maps the files, so startup time and resident memory
+do not depend on how much article text there is. Text is decoded only for
+the hits actually used to build the prompt context.
+"""
+
+import mmap
+import os
+import pickle
+import sys
+import types
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from profiling import profiled, span
+from sharded_search import ShardedSearcher, save_matrix
+
+FIELDS = ('title', 'content', 'source', 'url')
+
+
+def store_paths(prefix: str) -> Dict[str, str]:
+    return {
+        'embeddings': prefix + '.npy',
+        'text': prefix + '.text',
+        'offsets': prefix + '.offsets.npy'
+    }
+
+
+def _field(article: Any, name: str) -> str:
+    if isinstance(article, dict):
+        value = article.get(name, '')
+    else:
+        value = getattr(article, name, '')
+    return value or ''
+
+
+class StoredArticle:
+    """
+    Read-only view of one article; fields are decoded from the blob on access
+    """
+
+    def __init__(self, store: 'ArticleTextStore', index: int):
+        self._store = store
+        self.index = index
+
+    @property
+    def title(self) -> str:
+        return self._store.field(self.index, 'title')
+
+    @property
+    def content(self) -> str:
+        return self._store.field(self.index, 'content')
+
+    @property
+    def source(self) -> str:
+        return self._store.field(self.index, 'source')
+
+    @property
+    def url(self) -> str:
+        return self._store.field(self.index, 'url')
+
+    def to_dict(self) -> Dict[str, str]:
+        return {name: self._store.field(self.index, name) for name in FIELDS}
+
+    def __repr__(self) -> str:
+        return f"StoredArticle({self.index}, title={self.title!r})"
+
+
+class ArticleTextStore:
+    """
+    Article fields in one UTF-8 blob, indexed by an offsets array
+    """
+
+    def __init__(self, text_path: str, offsets_path: str):
+        self.offsets = np.load(offsets_path, mmap_mode='r')
+        self._file = open(text_path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        # mmap refuses zero-length files
+        self._blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    @staticmethod
+    def write(text_path: str, offsets_path: str, articles: Iterable[Any]) -> int:
+        """
+        Stream articles into the blob; returns the number written
+        """
+        offsets = [0]
+        position = 0
+        with open(text_path, 'wb') as f:
+            for article in articles:
+                for name in FIELDS:
+                    data = _field(article, name).encode('utf-8')
+                    f.write(data)
+                    position += len(data)
+                    offsets.append(position)
+        np.save(offsets_path, np.asarray(offsets, dtype=np.int64))
+        return (len(offsets) - 1) // len(FIELDS)
+
+    def __len__(self) -> int:
+        return (len(self.offsets) - 1) // len(FIELDS)
+
+    def field(self, index: int, name: str) -> str:
+        if not 0 <= index < len(self):
+            raise IndexError(f"Article index out of range: {index}")
+        slot = index * len(FIELDS) + FIELDS.index(name)
+        start, end = int(self.offsets[slot]), int(self.offsets[slot + 1])
+        return self._blob[start:end].decode('utf-8')
+
+    def __getitem__(self, index: int) -> StoredArticle:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Article index out of range: {index}")
+        return StoredArticle(self, index)
+
+    def close(self) -> None:
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._file.close()
+        self.offsets = None
+
+
+class ArticleStore:
+    """
+    Embeddings and lazily-read article text opened from a common prefix
+    """
+
+    @profiled('ArticleStore.open')
+    def __init__(self, prefix: str, workers: Optional[int] = None):
+        paths = store_paths(prefix)
+        self.prefix = prefix
+        self.searcher = ShardedSearcher(paths['embeddings'], workers=workers)
+        self.texts = ArticleTextStore(paths['text'], paths['offsets'])
+        if len(self.searcher) != len(self.texts):
+            self.close()
+            raise ValueError(f"Store {prefix} is inconsistent: embeddings and text counts differ")
+
+    @staticmethod
+    @profiled('ArticleStore.write')
+    def write(prefix: str, articles: List[Any]) -> int:
+        """
+        Write articles carrying an `embedding` attribute (or key) to a store
+        """
+        paths = store_paths(prefix)
+        embeddings = [
+            article['embedding'] if isinstance(article, dict) else article.embedding
+            for article in articles
+        ]
+        matrix = np.asarray(embeddings, dtype=np.float32) if embeddings else np.zeros((0, 0), dtype=np.float32)
+        save_matrix(matrix, paths['embeddings'])
+        return ArticleTextStore.write(paths['text'], paths['offsets'], articles)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __enter__(self) -> 'ArticleStore':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.searcher.close()
+        self.texts.close()
+
+    @profiled('ArticleStore.find_similar')
+    def find_similar(self, query_embedding, k: int = 3) -> List[Tuple[StoredArticle, float]]:
+        """
+        Top-k articles for one query embedding; only their text is read
+        """
+        if len(self) == 0:
+            return []
+        indices, scores = self.searcher.search(query_embedding, k)
+        with span('article text fetch'):
+            return [(self.texts[int(i)], float(score)) for i, score in zip(indices, scores)]
+
+
+class _PickledArticle:
+    """
+    Stand-in for human_writer_rag.Article when that module is not importable
+
+    Named after the real class so re-pickled articles still load in
+    HumanWriterRAG.load_embeddings().
+    """
+
+_PickledArticle.__module__ = 'human_writer_rag'
+_PickledArticle.__name__ = _PickledArticle.__qualname__ = 'Article'
+
+
+class _ArticleUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        try:
+            return super().find_class(module, name)
+        except (ImportError, AttributeError):
+            if (module, name) == ('human_writer_rag', 'Article'):
+                return _PickledArticle
+            raise
+
+
+def load_articles(source: str) -> List[Any]:
+    """
+    Articles from a save_embeddings() pickle or an article store prefix
+
+    Store articles are returned as dicts carrying their embedding.
+    """
+    if os.path.exists(store_paths(source)['text']):
+        with ArticleStore(source) as store:
+            articles = []
+            for i in range(len(store)):
+                article = store.texts[i].to_dict()
+                article['embedding'] = np.asarray(store.searcher.matrix[i])
+                articles.append(article)
+        return articles
+
+    with open(source, 'rb') as f:
+        return _ArticleUnpickler(f).load()
+
+
+def save_articles_pickle(articles: List[Any], path: str) -> None:
+    """
+    Write articles in the save_embeddings() pickle format
+    """
+    shim = None
+    if any(isinstance(article, _PickledArticle) for article in articles):
+        try:
+            import human_writer_rag  # noqa: F401
+        except ImportError:
+            # Let pickle resolve the stand-in under the real class's name
+            shim = types.ModuleType('human_writer_rag')
+            shim.Article = _PickledArticle
+            sys.modules['human_writer_rag'] = shim
+
+    try:
+        with open(path, 'wb') as f:
+            pickle.dump(articles, f)
+    finally:
+        if shim is not None and sys.modules.get('human_writer_rag') is shim:
+            del sys.modules['human_writer_rag']
+
+
+@profiled('convert_pickle')
+def convert_pickle(pickle_path: str, prefix: str) -> int:
+    """
+    Migrate a save_embeddings() pickle to the split mmap store
+    """
+    with open(pickle_path, 'rb') as f:
+        articles = _ArticleUnpickler(f).load()
+    return ArticleStore.write(prefix, articles)
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python article_store.py <article_embeddings.pkl> <output_prefix>")
+        print("Example: python article_store.py article_embeddings.pkl knowledge_base")
+        sys.exit(1)
+
+    count = convert_pickle(sys.argv[1], sys.argv[2])
+    for path in store_paths(sys.argv[2]).values():
+        print(f"Wrote {path} ({os.path.getsize(path)} bytes)")
+    print(f"Converted {count} articles")
+
+
+if __name__ == "__main__":
+    main()
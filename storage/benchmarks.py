@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+Offline Benchmark Suite for Checker and Retrieval Components
+
+Runs without network access or an OpenAI key: detectText responses and
+article embeddings are synthesized from a fixed seed, so numbers from two
+versions of the code are directly comparable. Embeddings are drawn from a
+mixture of Gaussians on the unit sphere, which is closer to sentence
+embeddings than isotropic noise.
+
+search_approx_reference_* rows time a random-projection scan defined in
+this file. No shipped code uses it; it is a yardstick for what an
+approximate index would have to beat, not a regression target.
+
+Usage:
+    python benchmarks.py                          # full suite, 1k/100k/1M vectors
+    python benchmarks.py --sizes 1000,100000 --only search
+    python benchmarks.py --compare benchmark-results/old.json
+
+Results are written as JSON to benchmark-results/ (or --output), and
+--compare prints the change of every benchmark against an earlier run.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from article_store import ArticleStore, store_paths
+from detection_stats import DetectionStats
+from near_duplicates import NearDuplicateIndex
+from sharded_search import ShardedSearcher, _search_shard, _top_k, merge_top_k, normalize_rows
+from zerogptChecker import ZeroGPTChecker
+
+SEED = 1234
+DIM = 384
+PROJECTED_DIM = 64
+
+# Synthetic embeddings: one cluster per ~500 vectors, with noise chosen so a
+# vector's cosine similarity to its cluster centre is about 0.6
+VECTORS_PER_CLUSTER = 500
+CLUSTER_NOISE = 0.07
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = (1000, 100000, 1000000)
+DEFAULT_STORE_SIZES = (1000, 10000)
+
+_WORDS = (
+    "the of and to in a is that for it as was with be by on not he this are or his from at which "
+    "but have an they you were her she there would their we him been has when who will more no if "
+    "out so said what up its about into than them can only other new some could time these two may "
+    "then do first any my now such like our over man me even most made after also did many before "
+    "must through back years where much your way well down should because each just those people "
+    "policy energy market health climate research school digital social remote economic growth"
+).split()
+
+
+def _measure(fn: Callable[[], Any], repeat: int = 5, number: int = 1) -> Dict[str, float]:
+    """
+    Best and mean wall time per call over `repeat` rounds of `number` calls
+    """
+    fn()  # warm-up
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - started) / number)
+    best = min(rounds)
+    return {
+        'best_s': best,
+        'mean_s': sum(rounds) / len(rounds),
+        'ops_per_s': 1.0 / best if best > 0 else float('inf')
+    }
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def synthetic_detect_responses(count: int, seed: int = SEED) -> List[Dict[str, Any]]:
+    """
+    detectText response bodies shaped like the ones the API returns
+    """
+    rng = random.Random(seed)
+    responses = []
+    for _ in range(count):
+        sentences = [_text(rng, rng.randint(8, 30)) for _ in range(rng.randint(3, 12))]
+        flagged = [s for s in sentences if rng.random() < 0.4]
+        fake = round(rng.uniform(0, 100), 2)
+        responses.append({
+            'success': True,
+            'code': 200,
+            'message': 'detection result passed to proxy',
+            'data': {
+                'sentences': [],
+                'isHuman': 0 if fake > 50 else 1,
+                'additional_feedback': '',
+                'h': flagged,
+                'hi': [],
+                'textWords': sum(len(s.split()) for s in sentences),
+                'aiWords': sum(len(s.split()) for s in flagged),
+                'fakePercentage': fake,
+                'specialIndexes': [],
+                'specialSentences': [],
+                'originalParagraph': " ".join(sentences),
+                'feedback': 'Your Text is AI/GPT Generated' if fake > 50 else 'Your Text is Human written',
+                'input_text': " ".join(sentences),
+                'detected_language': rng.choice(['en', 'en', 'en', 'fr', 'es', 'de'])
+            }
+        })
+    return responses
+
+
+def cluster_centers(rows: int, dim: int, seed: int = SEED) -> np.ndarray:
+    clusters = max(1, rows // VECTORS_PER_CLUSTER)
+    return normalize_rows(np.random.default_rng(seed).standard_normal((clusters, dim), dtype=np.float32))
+
+
+def clustered_vectors(rng: np.random.Generator, centers: np.ndarray, count: int) -> np.ndarray:
+    """
+    Normalized vectors scattered around randomly chosen centres
+    """
+    assignment = rng.integers(0, len(centers), size=count)
+    noise = rng.standard_normal((count, centers.shape[1]), dtype=np.float32) * CLUSTER_NOISE
+    return normalize_rows(centers[assignment] + noise)
+
+
+def _write_synthetic_matrix(path: str, centers: np.ndarray, rows: int, seed: int = SEED,
+                            chunk: int = 65536) -> np.ndarray:
+    """
+    Stream clustered vectors into a .npy without holding two copies
+    """
+    rng = np.random.default_rng(seed)
+    matrix = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(rows, centers.shape[1]))
+    for start in range(0, rows, chunk):
+        end = min(rows, start + chunk)
+        matrix[start:end] = clustered_vectors(rng, centers, end - start)
+    matrix.flush()
+    return np.load(path, mmap_mode='r')
+
+
+def _project(matrix: np.ndarray, components: np.ndarray, chunk: int = 65536) -> np.ndarray:
+    projected = np.empty((matrix.shape[0], components.shape[1]), dtype=np.float32)
+    for start in range(0, matrix.shape[0], chunk):
+        projected[start:start + chunk] = np.asarray(matrix[start:start + chunk]) @ components
+    return projected
+
+
+def approximate_search(projected: np.ndarray, components: np.ndarray, matrix: np.ndarray,
+                       queries: np.ndarray, k: int, candidates: int) -> np.ndarray:
+    """
+    Reference approximate top-k: random-projection scan, exact rerank
+
+    Not used by any shipped code path; see the module docstring.
+    """
+    shortlist, _ = _top_k((queries @ components) @ projected.T, candidates)
+    results = np.empty((len(queries), k), dtype=np.int64)
+    for q, rows in enumerate(np.sort(shortlist, axis=1)):
+        best, _ = _top_k((np.asarray(matrix[rows]) @ queries[q])[np.newaxis, :], k)
+        results[q] = rows[best[0]]
+    return results
+
+
+def bench_parse(count: int = 2000) -> Dict[str, Any]:
+    checker = ZeroGPTChecker()
+    responses = synthetic_detect_responses(count)
+
+    def run():
+        for response in responses:
+            checker._parse_result(response)
+
+    timing = _measure(run)
+    return {'parse_result': dict(timing, items=count, items_per_s=count / timing['best_s'])}
+
+
+def bench_stats(count: int = 20000, workers: int = 8) -> Dict[str, Any]:
+    checker = ZeroGPTChecker()
+    parsed = [checker._parse_result(r) for r in synthetic_detect_responses(count)]
+    parsed += [{'success': False, 'error': 'HTTP 429'}] * (count // 50)
+
+    def record():
+        stats = DetectionStats()
+        for result in parsed:
+            stats.record(result)
+
+    parts = []
+    for w in range(workers):
+        part = DetectionStats()
+        for result in parsed[w::workers]:
+            part.record(result)
+        parts.append(part.to_dict())
+
+    def merge():
+        DetectionStats.merged(DetectionStats.from_dict(part) for part in parts)
+
+    timing = _measure(record)
+    return {
+        'stats_record': dict(timing, items=len(parsed), items_per_s=len(parsed) / timing['best_s']),
+        'stats_merge': dict(_measure(merge, number=10), parts=workers)
+    }
+
+
+def bench_dedup(count: int = 500) -> Dict[str, Any]:
+    """
+    Near-duplicate index lookups: hits (copies) versus misses (new text)
+    """
+    rng = random.Random(SEED)
+    articles = [_text(rng, 400) for _ in range(count)]
+    index = NearDuplicateIndex(threshold=0.8)
+    for i, article in enumerate(articles):
+        index.add(i, article)
+
+    copies = [article[:-40] + " Reprinted with permission." for article in articles[:100]]
+    fresh = [_text(rng, 400) for _ in range(100)]
+    hits = [index.hasher.signature(text) for text in copies]
+    misses = [index.hasher.signature(text) for text in fresh]
+
+    def lookup(signatures):
+        return lambda: [index.query(signature=signature) for signature in signatures]
+
+    return {
+        'dedup_signature': dict(_measure(lambda: [index.hasher.signature(t) for t in fresh]), items=len(fresh)),
+        'dedup_hit': dict(_measure(lookup(hits)), items=len(hits), indexed=count,
+                          hit_rate=sum(bool(index.query(signature=s)) for s in hits) / len(hits)),
+        'dedup_miss': dict(_measure(lookup(misses)), items=len(misses), indexed=count,
+                           false_hit_rate=sum(bool(index.query(signature=s)) for s in misses) / len(misses))
+    }
+
+
+def _evict(paths: List[str]) -> None:
+    """
+    Ask the OS to drop the files from the page cache (best effort)
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def _measure_cold(code: str, files: List[str], repeat: int = 3) -> Dict[str, float]:
+    """
+    Time `code` in fresh interpreters with the given files evicted
+
+    The child prints {"import_s": ..., "open_s": ...}; interpreter start-up
+    itself is excluded.
+    """
+    rounds = []
+    for _ in range(repeat):
+        _evict(files)
+        output = subprocess.run(
+            [sys.executable, '-c', code],
+            capture_output=True, text=True, check=True, cwd=BENCH_DIR,
+            env=dict(os.environ, HUMANIZER_PROFILE='')
+        ).stdout
+        rounds.append(json.loads(output.strip().splitlines()[-1]))
+    totals = [r['import_s'] + r['open_s'] for r in rounds]
+    best = min(range(repeat), key=lambda i: totals[i])
+    return {
+        'best_s': totals[best],
+        'mean_s': sum(totals) / repeat,
+        'ops_per_s': 1.0 / totals[best] if totals[best] > 0 else float('inf'),
+        'import_s': rounds[best]['import_s'],
+        'open_s': rounds[best]['open_s']
+    }
+
+
+_COLD_PICKLE = """
+import json, time
+t0 = time.perf_counter()
+import pickle
+t1 = time.perf_counter()
+with open({path!r}, 'rb') as f:
+    pickle.load(f)
+t2 = time.perf_counter()
+print(json.dumps({{'import_s': t1 - t0, 'open_s': t2 - t1}}))
+"""
+
+_COLD_STORE = """
+import json, time
+t0 = time.perf_counter()
+from article_store import ArticleStore
+t1 = time.perf_counter()
+ArticleStore({prefix!r}, workers=1).close()
+t2 = time.perf_counter()
+print(json.dumps({{'import_s': t1 - t0, 'open_s': t2 - t1}}))
+"""
+
+
+def bench_store_load(sizes, workdir: str) -> Dict[str, Any]:
+    """
+    Opening the split mmap store versus unpickling articles with text
+
+    Warm numbers reuse this process (imports and page cache already hot);
+    cold numbers come from a fresh interpreter with the files evicted.
+    """
+    results = {}
+    rng = random.Random(SEED)
+    vectors = np.random.default_rng(SEED)
+    for size in sizes:
+        articles = [{
+            'title': _text(rng, 8),
+            'content': _text(rng, 600),
+            'source': 'Synthetic',
+            'url': f'https://example.com/{i}',
+            'embedding': vectors.standard_normal(DIM, dtype=np.float32).tolist()
+        } for i in range(size)]
+
+        pickle_path = os.path.join(workdir, f'articles-{size}.pkl')
+        with open(pickle_path, 'wb') as f:
+            pickle.dump(articles, f)
+        prefix = os.path.join(workdir, f'store-{size}')
+        ArticleStore.write(prefix, articles)
+        text_bytes = os.path.getsize(store_paths(prefix)['text'])
+        del articles
+
+        def load_pickle():
+            with open(pickle_path, 'rb') as f:
+                pickle.load(f)
+
+        def open_store():
+            ArticleStore(prefix, workers=1).close()
+
+        store_files = list(store_paths(prefix).values())
+        results[f'store_load_pickle_warm_{size}'] = dict(_measure(load_pickle, repeat=3), articles=size,
+                                                          text_bytes=text_bytes)
+        results[f'store_load_pickle_cold_{size}'] = dict(
+            _measure_cold(_COLD_PICKLE.format(path=pickle_path), [pickle_path]),
+            articles=size, text_bytes=text_bytes
+        )
+        results[f'store_load_mmap_warm_{size}'] = dict(_measure(open_store, repeat=3), articles=size,
+                                                        text_bytes=text_bytes)
+        results[f'store_load_mmap_cold_{size}'] = dict(
+            _measure_cold(_COLD_STORE.format(prefix=prefix), store_files),
+            articles=size, text_bytes=text_bytes
+        )
+    return results
+
+
+def bench_search(sizes, workdir: str, dim: int = DIM, queries: int = 16, k: int = 10,
+                 workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Exact single-process, exact sharded and reference approximate top-k
+
+    Queries come from the same cluster mixture as the corpus.
+    """
+    results = {}
+    for size in sizes:
+        path = os.path.join(workdir, f'vectors-{size}.npy')
+        centers = cluster_centers(size, dim)
+        matrix = _write_synthetic_matrix(path, centers, size)
+        query_vectors = clustered_vectors(np.random.default_rng(SEED + 1), centers, queries)
+        exact = _search_shard(matrix, 0, size, query_vectors, k)[0]
+
+        results[f'search_exact_{size}'] = dict(
+            _measure(lambda: _search_shard(matrix, 0, size, query_vectors, k), repeat=3),
+            rows=size, queries=queries, k=k, clusters=len(centers)
+        )
+
+        with ShardedSearcher(path, workers=workers) as searcher:
+            results[f'search_sharded_{size}'] = dict(
+                _measure(lambda: searcher.search(query_vectors, k), repeat=3),
+                rows=size, queries=queries, k=k, shards=len(searcher._shards())
+            )
+
+        components = np.random.default_rng(SEED + 2).standard_normal((dim, PROJECTED_DIM), dtype=np.float32)
+        projected = _project(matrix, components)
+        candidates = min(size, max(k * 50, size // 100))
+
+        def search():
+            return approximate_search(projected, components, matrix, query_vectors, k, candidates)
+
+        recall = np.mean([len(set(a) & set(e)) / k for a, e in zip(search(), exact)])
+        results[f'search_approx_reference_{size}'] = dict(
+            _measure(search, repeat=3),
+            rows=size, queries=queries, k=k, projected_dim=PROJECTED_DIM, candidates=candidates,
+            recall_at_k=float(recall), reference_only=True
+        )
+
+        del matrix, projected
+        os.remove(path)
+
+    # Merging per-shard top-k blocks depends on shard count, not corpus size
+    shards = workers or os.cpu_count() or 1
+    parts = [_top_k(np.random.default_rng(s).standard_normal((queries, k)), k, offset=s * k)
+             for s in range(shards)]
+    results['merge_top_k'] = dict(_measure(lambda: merge_top_k(parts, k), number=100), shards=shards)
+    return results
+
+
+def _environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': SEED
+    }
+
+
+def compare(old_path: str, new: Dict[str, Any]) -> None:
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old = json.load(f)
+    print(f"\nComparison against {old_path} (commit {old['environment'].get('commit')})")
+    print("-" * 60)
+    for name, result in new['results'].items():
+        before = old['results'].get(name)
+        if before is None:
+            print(f"{name:<36} new")
+            continue
+        change = (result['best_s'] - before['best_s']) / before['best_s'] * 100
+        flag = "  <-- slower" if change > 10 and not result.get('reference_only') else ""
+        print(f"{name:<36} {before['best_s'] * 1000:10.3f} ms -> {result['best_s'] * 1000:10.3f} ms "
+              f"({change:+.1f}%){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for checker and retrieval components")
+    parser.add_argument('--sizes', default=",".join(map(str, DEFAULT_SIZES)),
+                        help="vector counts for search benchmarks")
+    parser.add_argument('--store-sizes', default=",".join(map(str, DEFAULT_STORE_SIZES)),
+                        help="article counts for store load benchmarks")
+    parser.add_argument('--dim', type=int, default=DIM)
+    parser.add_argument('--workers', type=int, default=None, help="processes for sharded search")
+    parser.add_argument('--only', choices=['parse', 'stats', 'dedup', 'store', 'search'], action='append',
+                        help="run only the given group (repeatable)")
+    parser.add_argument('--output', help="results file (default: benchmark-results/<timestamp>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    store_sizes = [int(s) for s in args.store_sizes.split(',') if s]
+    groups = args.only or ['parse', 'stats', 'dedup', 'store', 'search']
+
+    workdir = tempfile.mkdtemp(prefix='humanizer_bench_')
+    results: Dict[str, Any] = {}
+    try:
+        for group in groups:
+            print(f"Running {group} benchmarks...")
+            if group == 'parse':
+                results.update(bench_parse())
+            elif group == 'stats':
+                results.update(bench_stats())
+            elif group == 'dedup':
+                results.update(bench_dedup())
+            elif group == 'store':
+                results.update(bench_store_load(store_sizes, workdir))
+            elif group == 'search':
+                results.update(bench_search(sizes, workdir, dim=args.dim, workers=args.workers))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {'environment': _environment(), 'results': results}
+
+    print("\n" + "=" * 60)
+    for name, result in results.items():
+        extra = ""
+        if 'recall_at_k' in result:
+            extra = f"  recall@k {result['recall_at_k']:.3f}"
+        elif 'hit_rate' in result:
+            extra = f"  hit rate {result['hit_rate']:.2f}"
+        if 'open_s' in result:
+            extra += f"  (import {result['import_s'] * 1000:.1f} ms, open {result['open_s'] * 1000:.1f} ms)"
+        if result.get('reference_only'):
+            extra += "  [reference, no product path]"
+        print(f"{name:<36} {result['best_s'] * 1000:10.3f} ms{extra}")
+
+    output = args.output or os.path.join('benchmark-results', f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        compare(args.compare, report)
+
+
+if __name__ == "__main__":
+    main()
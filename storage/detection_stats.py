@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Streaming Aggregate Statistics for ZeroGPT Detection Runs
+
+Feed every checker result into a DetectionStats instance instead of keeping
+the results in a list. Memory stays constant no matter how many checks are
+recorded, and stats from separate worker processes can be merged.
+"""
+
+import json
+import math
+from typing import Dict, Any, Optional, Iterable
+
+# fakePercentage is bucketed at this resolution for the quantile sketch,
+# so quantiles are exact to within half a bucket (0.05 percentage points).
+BUCKETS_PER_PERCENT = 10
+NUM_BUCKETS = 100 * BUCKETS_PER_PERCENT + 1
+
+# Languages beyond this limit are folded into a single 'other' entry so a
+# noisy detected_language field cannot grow the stats without bound.
+MAX_LANGUAGES = 64
+OTHER_LANGUAGE = 'other'
+
+FORMAT_VERSION = 1
+
+
+def _new_language_entry() -> Dict[str, Any]:
+    return {
+        'checks': 0,
+        'ai': 0,
+        'human': 0,
+        'text_words': 0,
+        'ai_words': 0,
+        'percentage_sum': 0.0
+    }
+
+
+class DetectionStats:
+    """
+    Constant-memory aggregate over a stream of detection results
+    """
+
+    def __init__(self):
+        self.checks = 0
+        self.errors = 0
+        self.error_kinds: Dict[str, int] = {}
+
+        self.ai_count = 0
+        self.human_count = 0
+        self.text_words = 0
+        self.ai_words = 0
+
+        # Running mean/variance of fakePercentage (Welford)
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+        # Sparse histogram of fakePercentage: bucket index -> count
+        self.buckets: Dict[int, int] = {}
+
+        self.languages: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def successes(self) -> int:
+        return self.checks - self.errors
+
+    def record(self, result: Dict[str, Any]) -> None:
+        """
+        Record a result dict returned by any of the checkers
+
+        Accepts both the ZeroGPTChecker shape (fields under 'detection') and
+        the flat shape returned by the simple/file checkers.
+        """
+        if not result.get('success'):
+            self.add_error(result.get('error'))
+            return
+
+        detection = result.get('detection', result)
+        self.add(
+            ai_percentage=detection.get('ai_percentage', 0),
+            is_ai=detection.get('is_ai', False),
+            text_words=detection.get('text_words', 0),
+            ai_words=detection.get('ai_words', 0),
+            language=detection.get('detected_language', detection.get('language', ''))
+        )
+
+    def add(self, ai_percentage: float, is_ai: bool, text_words: int = 0,
+            ai_words: int = 0, language: str = '') -> None:
+        """
+        Record a single successful detection
+        """
+        value = min(max(float(ai_percentage or 0), 0.0), 100.0)
+
+        self.checks += 1
+        if is_ai:
+            self.ai_count += 1
+        else:
+            self.human_count += 1
+        self.text_words += int(text_words or 0)
+        self.ai_words += int(ai_words or 0)
+
+        n = self.successes
+        delta = value - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+        bucket = int(round(value * BUCKETS_PER_PERCENT))
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+        entry = self._language_entry(language)
+        entry['checks'] += 1
+        entry['ai' if is_ai else 'human'] += 1
+        entry['text_words'] += int(text_words or 0)
+        entry['ai_words'] += int(ai_words or 0)
+        entry['percentage_sum'] += value
+
+    def add_error(self, error: Any = '') -> None:
+        """
+        Record a failed check, grouped by HTTP status where available
+        """
+        error = str(error or '')
+        self.checks += 1
+        self.errors += 1
+        kind = error if error.startswith('HTTP ') else 'other'
+        self.error_kinds[kind] = self.error_kinds.get(kind, 0) + 1
+
+    def _language_entry(self, language: str) -> Dict[str, Any]:
+        language = (language or 'unknown').strip().lower() or 'unknown'
+        if language not in self.languages and len(self.languages) >= MAX_LANGUAGES:
+            language = OTHER_LANGUAGE
+        if language not in self.languages:
+            self.languages[language] = _new_language_entry()
+        return self.languages[language]
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Approximate quantile of fakePercentage, q in [0, 1]
+        """
+        n = self.successes
+        if n == 0:
+            return None
+        rank = min(max(q, 0.0), 1.0) * (n - 1)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                return bucket / BUCKETS_PER_PERCENT
+        return self.max
+
+    @property
+    def stddev(self) -> float:
+        n = self.successes
+        return math.sqrt(self.m2 / (n - 1)) if n > 1 else 0.0
+
+    def merge(self, other: 'DetectionStats') -> 'DetectionStats':
+        """
+        Fold another aggregate (e.g. from a worker process) into this one
+        """
+        n_a, n_b = self.successes, other.successes
+        if n_b:
+            n = n_a + n_b
+            delta = other.mean - self.mean
+            self.mean += delta * n_b / n
+            self.m2 += other.m2 + delta * delta * n_a * n_b / n
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+        self.checks += other.checks
+        self.errors += other.errors
+        for kind, count in other.error_kinds.items():
+            self.error_kinds[kind] = self.error_kinds.get(kind, 0) + count
+
+        self.ai_count += other.ai_count
+        self.human_count += other.human_count
+        self.text_words += other.text_words
+        self.ai_words += other.ai_words
+
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+
+        for language, theirs in other.languages.items():
+            entry = self._language_entry(language)
+            for key, value in theirs.items():
+                entry[key] += value
+
+        return self
+
+    @classmethod
+    def merged(cls, parts: Iterable['DetectionStats']) -> 'DetectionStats':
+        total = cls()
+        for part in parts:
+            total.merge(part)
+        return total
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Human-oriented report of the aggregate
+        """
+        n = self.successes
+        languages = {}
+        for language, entry in sorted(self.languages.items(), key=lambda item: -item[1]['checks']):
+            languages[language] = {
+                'checks': entry['checks'],
+                'ai': entry['ai'],
+                'human': entry['human'],
+                'text_words': entry['text_words'],
+                'ai_words': entry['ai_words'],
+                'mean_ai_percentage': entry['percentage_sum'] / entry['checks'] if entry['checks'] else 0.0
+            }
+
+        return {
+            'checks': self.checks,
+            'successes': n,
+            'errors': self.errors,
+            'error_rate': self.errors / self.checks if self.checks else 0.0,
+            'error_kinds': dict(self.error_kinds),
+            'ai': self.ai_count,
+            'human': self.human_count,
+            'ai_rate': self.ai_count / n if n else 0.0,
+            'text_words': self.text_words,
+            'ai_words': self.ai_words,
+            'ai_percentage': {
+                'mean': self.mean if n else None,
+                'stddev': self.stddev,
+                'min': self.min,
+                'p50': self.quantile(0.5),
+                'p90': self.quantile(0.9),
+                'p99': self.quantile(0.99),
+                'max': self.max
+            },
+            'languages': languages
+        }
+
+    def format_summary(self) -> str:
+        s = self.summary()
+        pct = s['ai_percentage']
+        lines = [
+            f"Checks: {s['checks']} ({s['successes']} ok, {s['errors']} errors, {s['error_rate']:.1%} error rate)",
+            f"AI / Human: {s['ai']} / {s['human']} ({s['ai_rate']:.1%} AI)",
+            f"Words: {s['text_words']} total, {s['ai_words']} AI"
+        ]
+        if s['successes']:
+            lines.append(
+                f"AI Percentage: mean {pct['mean']:.1f}%, p50 {pct['p50']:.1f}%, "
+                f"p90 {pct['p90']:.1f}%, p99 {pct['p99']:.1f}%"
+            )
+        for kind, count in sorted(s['error_kinds'].items()):
+            lines.append(f"Error {kind}: {count}")
+        for language, entry in s['languages'].items():
+            lines.append(
+                f"Language {language}: {entry['checks']} checks, {entry['ai']} AI, "
+                f"mean {entry['mean_ai_percentage']:.1f}%"
+            )
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Lossless JSON-serializable form, suitable for merging later
+        """
+        return {
+            'version': FORMAT_VERSION,
+            'checks': self.checks,
+            'errors': self.errors,
+            'error_kinds': dict(self.error_kinds),
+            'ai_count': self.ai_count,
+            'human_count': self.human_count,
+            'text_words': self.text_words,
+            'ai_words': self.ai_words,
+            'mean': self.mean,
+            'm2': self.m2,
+            'min': self.min,
+            'max': self.max,
+            'buckets': {str(bucket): count for bucket, count in self.buckets.items()},
+            'languages': {language: dict(entry) for language, entry in self.languages.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DetectionStats':
+        if data.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported stats format version: {data.get('version')}")
+        stats = cls()
+        stats.checks = data['checks']
+        stats.errors = data['errors']
+        stats.error_kinds = dict(data['error_kinds'])
+        stats.ai_count = data['ai_count']
+        stats.human_count = data['human_count']
+        stats.text_words = data['text_words']
+        stats.ai_words = data['ai_words']
+        stats.mean = data['mean']
+        stats.m2 = data['m2']
+        stats.min = data['min']
+        stats.max = data['max']
+        stats.buckets = {int(bucket): count for bucket, count in data['buckets'].items()}
+        stats.languages = {language: dict(entry) for language, entry in data['languages'].items()}
+        return stats
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> 'DetectionStats':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def main():
+    """
+    Merge saved stats files from several workers and print the report
+    """
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python detection_stats.py <stats.json> [<stats.json> ...]")
+        sys.exit(1)
+
+    total = DetectionStats.merged(DetectionStats.load(path) for path in sys.argv[1:])
+    print(total.format_summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Detection for Knowledge Base Articles (MinHash + LSH)
+
+Syndicated or re-pasted articles are caught at ingest time, before any
+embedding work is done, and existing stores can be deduplicated in bulk.
+"""
+
+import pickle
+import re
+import zlib
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from profiling import profiled
+
+# Mersenne prime for the universal hash family; 32-bit shingle hashes times
+# 31-bit coefficients stay below 2**63, so uint64 arithmetic never overflows.
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """
+    Lower-cased word n-grams of the text
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def choose_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Pick (bands, rows) whose LSH S-curve crosses 50% nearest the threshold
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        crossing = (1.0 / bands) ** (1.0 / rows)
+        error = abs(crossing - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class MinHasher:
+    """
+    Fixed-size MinHash signatures over word shingles
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self._a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+
+    @profiled('MinHasher.signature')
+    def signature(self, text: str) -> np.ndarray:
+        grams = shingles(text, self.shingle_size)
+        if not grams:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        hashes = np.fromiter(
+            (zlib.crc32(gram.encode('utf-8')) for gram in grams),
+            dtype=np.uint64,
+            count=len(grams)
+        )
+        permuted = (np.outer(hashes, self._a) + self._b) % _PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+
+class NearDuplicateIndex:
+    """
+    LSH index of MinHash signatures
+
+    Candidates sharing any band bucket are confirmed by their estimated
+    Jaccard similarity, so the threshold is applied exactly on signatures.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 3,
+                 seed: int = 1):
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError(f"Jaccard threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size, seed=seed)
+        self.bands, self.rows = choose_bands(threshold, num_perm)
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [{} for _ in range(self.bands)]
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+        self._next_key = 0
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._signatures
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    @profiled('NearDuplicateIndex.query')
+    def query(self, text: str = None, signature: np.ndarray = None,
+              threshold: Optional[float] = None) -> List[Tuple[Hashable, float]]:
+        """
+        Indexed keys whose estimated Jaccard similarity meets the threshold
+
+        A lower threshold than the index was built for only finds pairs that
+        the band layout already surfaces as candidates.
+        """
+        if signature is None:
+            signature = self.hasher.signature(text)
+        threshold = self.threshold if threshold is None else threshold
+
+        candidates = set()
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(band_key, ()))
+
+        matches = []
+        for key in candidates:
+            similarity = float(np.mean(self._signatures[key] == signature))
+            if similarity >= threshold:
+                matches.append((key, similarity))
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+    def is_duplicate(self, text: str) -> bool:
+        return bool(self.query(text))
+
+    def next_key(self) -> int:
+        """
+        An integer key greater than every integer key indexed so far
+        """
+        return self._next_key
+
+    def add(self, key: Hashable, text: str = None, signature: np.ndarray = None) -> None:
+        if key in self._signatures:
+            raise KeyError(f"Key already indexed: {key!r}")
+        if signature is None:
+            signature = self.hasher.signature(text)
+        self._signatures[key] = signature
+        if isinstance(key, int) and key >= self._next_key:
+            self._next_key = key + 1
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(band_key, []).append(key)
+
+    def add_articles(self, articles: List[Any]) -> None:
+        """
+        Seed the index with articles already in the knowledge base
+
+        Articles are keyed by their position in the list, so the index
+        should be empty or built from the same list.
+        """
+        for position, article in enumerate(articles):
+            self.add(position, _content(article))
+
+    @classmethod
+    def from_articles(cls, articles: List[Any], **kwargs) -> 'NearDuplicateIndex':
+        index = cls(**kwargs)
+        index.add_articles(articles)
+        return index
+
+    def add_if_new(self, key: Hashable, text: str) -> Optional[List[Tuple[Hashable, float]]]:
+        """
+        Index the text unless it near-duplicates an indexed one
+
+        Returns None when added, otherwise the matching keys.
+        """
+        signature = self.hasher.signature(text)
+        matches = self.query(signature=signature)
+        if matches:
+            return matches
+        self.add(key, signature=signature)
+        return None
+
+    def save(self, path: str) -> None:
+        state = {
+            'threshold': self.threshold,
+            'num_perm': self.hasher.num_perm,
+            'shingle_size': self.hasher.shingle_size,
+            'seed': self.hasher.seed,
+            'signatures': self._signatures
+        }
+        with open(path, 'wb') as f:
+            pickle.dump(state, f)
+
+    @classmethod
+    def load(cls, path: str) -> 'NearDuplicateIndex':
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        index = cls(
+            threshold=state['threshold'],
+            num_perm=state['num_perm'],
+            shingle_size=state['shingle_size'],
+            seed=state['seed']
+        )
+        for key, signature in state['signatures'].items():
+            index.add(key, signature=signature)
+        return index
+
+
+def _content(article: Any) -> str:
+    return article.get('content', '') if isinstance(article, dict) else article.content
+
+
+def add_article_if_new(rag: Any, index: NearDuplicateIndex, title: str, content: str,
+                       source: str, url: str = '', key: Optional[Hashable] = None) -> bool:
+    """
+    Call rag.add_article only if the content is not a near-duplicate
+
+    The check runs before add_article, so duplicates never reach the
+    embedding model. The article is indexed only once add_article has
+    succeeded, so a failed add can be retried. Without a key, the next
+    free integer key is used. Returns True if the article was added.
+    """
+    signature = index.hasher.signature(content)
+    matches = index.query(signature=signature)
+    if matches:
+        print(f"Skipping near-duplicate article: {title} "
+              f"(matches #{matches[0][0]}, similarity {matches[0][1]:.2f})")
+        return False
+    rag.add_article(title=title, content=content, source=source, url=url)
+    index.add(index.next_key() if key is None else key, signature=signature)
+    return True
+
+
+def dedup_articles(articles: List[Any], threshold: float = 0.8,
+                   index: Optional[NearDuplicateIndex] = None) -> Tuple[List[Any], List[Tuple[int, int, float]]]:
+    """
+    Keep the first of each near-duplicate group, preserving order
+
+    A caller-supplied index is checked as well and receives the kept
+    articles under fresh integer keys. Returns (kept, dropped) where dropped
+    holds (position, match, similarity); match is the position of the kept
+    article, or the index key if the match was already indexed.
+    """
+    if index is None:
+        index = NearDuplicateIndex(threshold=threshold)
+    positions: Dict[Hashable, int] = {}
+    kept = []
+    dropped = []
+    for position, article in enumerate(articles):
+        key = index.next_key()
+        matches = index.add_if_new(key, _content(article))
+        if matches is None:
+            positions[key] = position
+            kept.append(article)
+        else:
+            match, similarity = matches[0]
+            dropped.append((position, positions.get(match, match), similarity))
+    return kept, dropped
+
+
+def main():
+    """
+    Bulk-deduplicate an embeddings pickle or an article store
+
+    The output is written in the same format as the input.
+    """
+    import os
+    import sys
+
+    from article_store import ArticleStore, load_articles, save_articles_pickle, store_paths
+
+    if len(sys.argv) not in (3, 4):
+        print("Usage: python near_duplicates.py <input.pkl> <output.pkl> [threshold]")
+        print("       python near_duplicates.py <store_prefix> <output_prefix> [threshold]")
+        print("Example: python near_duplicates.py article_embeddings.pkl article_embeddings_dedup.pkl 0.8")
+        sys.exit(1)
+
+    source, output = sys.argv[1], sys.argv[2]
+    threshold = float(sys.argv[3]) if len(sys.argv) == 4 else 0.8
+
+    articles = load_articles(source)
+    kept, dropped = dedup_articles(articles, threshold=threshold)
+    for position, kept_position, similarity in dropped:
+        print(f"Dropping #{position} (near-duplicate of #{kept_position}, similarity {similarity:.2f})")
+
+    if os.path.exists(store_paths(source)['text']):
+        ArticleStore.write(output, kept)
+        print(f"Kept {len(kept)} of {len(articles)} articles, wrote store {output}")
+    else:
+        save_articles_pickle(kept, output)
+        print(f"Kept {len(kept)} of {len(articles)} articles, wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
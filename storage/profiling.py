@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Opt-in Profiling Hooks for the Checker and Retrieval Paths
+
+Set HUMANIZER_PROFILE=1 (or call enable()) to profile every @profiled
+function with cProfile and time any span() blocks. A report with the top
+offenders is written when the process exits, or on demand with
+write_report().
+
+Allocation tracking has its own switch because tracemalloc slows every
+allocation and would distort the timings. With it on, tracing runs only for
+the duration of each outermost @profiled call, and the allocations those
+calls retain are summed per source line.
+
+Environment variables:
+    HUMANIZER_PROFILE         enable profiling when set to 1/true/yes
+    HUMANIZER_PROFILE_MEMORY  also sample allocations with tracemalloc
+    HUMANIZER_PROFILE_DIR     report directory (default: profiles)
+    HUMANIZER_PROFILE_TOP     rows per report table (default: 25)
+
+When disabled, @profiled costs one flag check per call and span() returns
+a shared no-op context manager.
+"""
+
+import atexit
+import contextlib
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, Optional
+
+_NULL_SPAN = contextlib.nullcontext()
+
+# Keep the profiler's own bookkeeping and import machinery out of the
+# allocation report
+_ALLOCATION_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>')
+]
+
+
+class _ProfilerState:
+    def __init__(self):
+        self.enabled = False
+        self.output_dir = 'profiles'
+        self.top = 25
+        self.profiler: Optional[cProfile.Profile] = None
+        self.owner: Optional[int] = None
+        self.depth = 0
+        self.lock = threading.Lock()
+        self.memory = False
+        self.start_snapshot: Optional[tracemalloc.Snapshot] = None
+        self.started_tracemalloc = False
+        self.allocations: Dict[str, list] = {}
+        self.peak = 0
+        self.spans: Dict[str, list] = {}
+        self.atexit_registered = False
+
+
+_state = _ProfilerState()
+
+
+def is_enabled() -> bool:
+    return _state.enabled
+
+
+def enable(output_dir: Optional[str] = None, top: Optional[int] = None, memory: bool = False) -> None:
+    """
+    Start profiling; reports go to output_dir when the process exits
+
+    memory=True also samples allocations around each outermost call.
+    """
+    if output_dir is not None:
+        _state.output_dir = output_dir
+    if top is not None:
+        _state.top = top
+    if _state.enabled:
+        return
+
+    _state.profiler = cProfile.Profile()
+    _state.memory = memory
+    _state.allocations = {}
+    _state.peak = 0
+    _state.spans = {}
+    _state.enabled = True
+
+    if not _state.atexit_registered:
+        atexit.register(_write_report_at_exit)
+        _state.atexit_registered = True
+
+
+def disable() -> None:
+    """
+    Stop collecting; already collected data is kept until write_report()
+    """
+    _state.enabled = False
+
+
+def stop_in_child() -> None:
+    """
+    Drop profiling inherited through fork, e.g. in pool worker initializers
+    """
+    _state.enabled = False
+    if _state.profiler is not None:
+        _state.profiler.disable()
+    _state.profiler = None
+    _state.owner = None
+    _state.depth = 0
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def _record_span(name: str, elapsed: float) -> None:
+    with _state.lock:
+        entry = _state.spans.get(name)
+        if entry is None:
+            _state.spans[name] = [1, elapsed, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+            if elapsed > entry[2]:
+                entry[2] = elapsed
+
+
+def _start_memory_sample() -> None:
+    if tracemalloc.is_tracing():
+        # Someone else is tracing; diff against the current state instead
+        _state.started_tracemalloc = False
+        _state.start_snapshot = tracemalloc.take_snapshot().filter_traces(_ALLOCATION_FILTERS)
+        tracemalloc.reset_peak()
+    else:
+        _state.started_tracemalloc = True
+        _state.start_snapshot = None
+        tracemalloc.start()
+
+
+def _finish_memory_sample() -> None:
+    snapshot = tracemalloc.take_snapshot().filter_traces(_ALLOCATION_FILTERS)
+    _state.peak = max(_state.peak, tracemalloc.get_traced_memory()[1])
+    if _state.started_tracemalloc:
+        tracemalloc.stop()
+        stats = snapshot.statistics('lineno')
+        changes = ((stat.traceback, stat.size, stat.count) for stat in stats)
+    else:
+        stats = snapshot.compare_to(_state.start_snapshot, 'lineno')
+        changes = ((stat.traceback, stat.size_diff, stat.count_diff) for stat in stats)
+    _state.start_snapshot = None
+
+    for traceback, size, count in changes:
+        if not size and not count:
+            continue
+        key = str(traceback[0])
+        entry = _state.allocations.get(key)
+        if entry is None:
+            _state.allocations[key] = [size, count]
+        else:
+            entry[0] += size
+            entry[1] += count
+
+
+@contextlib.contextmanager
+def _timed_span(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record_span(name, time.perf_counter() - started)
+
+
+def span(name: str):
+    """
+    Time a block under the given name when profiling is enabled
+    """
+    if not _state.enabled:
+        return _NULL_SPAN
+    return _timed_span(name)
+
+
+def _acquire_profiler() -> bool:
+    """
+    Turn the profiler on for the outermost profiled call on one thread
+    """
+    thread = threading.get_ident()
+    with _state.lock:
+        if _state.owner is None:
+            _state.owner = thread
+            _state.depth = 1
+            if _state.memory:
+                _start_memory_sample()
+            _state.profiler.enable()
+            return True
+        if _state.owner == thread:
+            _state.depth += 1
+            return True
+    return False
+
+
+def _release_profiler() -> None:
+    with _state.lock:
+        _state.depth -= 1
+        if _state.depth == 0:
+            _state.profiler.disable()
+            if _state.memory:
+                _finish_memory_sample()
+            _state.owner = None
+
+
+def profiled(name: Optional[str] = None) -> Callable:
+    """
+    Decorator profiling a function whenever profiling is enabled
+    """
+    def decorator(func: Callable) -> Callable:
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return func(*args, **kwargs)
+
+            # Only one cProfile can be active; calls made from other threads
+            # while it is held are still timed as spans.
+            owns = _acquire_profiler()
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record_span(label, time.perf_counter() - started)
+                if owns:
+                    _release_profiler()
+
+        return wrapper
+
+    return decorator
+
+
+def format_report() -> str:
+    """
+    Text report of spans, top functions and sampled allocations
+    """
+    out = io.StringIO()
+    top = _state.top
+
+    out.write("Timing spans\n")
+    out.write("=" * 60 + "\n")
+    out.write(f"{'span':<32}{'calls':>8}{'total s':>10}{'max ms':>10}\n")
+    for label, (calls, total, longest) in sorted(_state.spans.items(), key=lambda item: -item[1][1]):
+        out.write(f"{label:<32}{calls:>8}{total:>10.4f}{longest * 1000:>10.2f}\n")
+
+    if _state.profiler is not None:
+        out.write("\nTop functions by cumulative time\n")
+        out.write("=" * 60 + "\n")
+        try:
+            stats = pstats.Stats(_state.profiler, stream=out)
+            stats.sort_stats('cumulative').print_stats(top)
+        except TypeError:
+            out.write("No profiled calls recorded\n")
+
+    if _state.memory:
+        out.write("\nTop allocations retained by profiled calls\n")
+        out.write("=" * 60 + "\n")
+        out.write(f"Peak traced memory during a call: {_state.peak / 1024:.1f} KiB\n")
+        ranked = sorted(_state.allocations.items(), key=lambda item: -abs(item[1][0]))
+        for location, (size, count) in ranked[:top]:
+            out.write(f"{location}: {size / 1024:+.1f} KiB, {count:+d} blocks\n")
+
+    return out.getvalue()
+
+
+def write_report(output_dir: Optional[str] = None) -> Optional[str]:
+    """
+    Write <dir>/profile-<time>-<pid>.{txt,prof}; returns the text path
+    """
+    if _state.profiler is None:
+        return None
+
+    output_dir = output_dir or _state.output_dir
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.join(output_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+
+    with open(stem + '.txt', 'w', encoding='utf-8') as f:
+        f.write(format_report())
+    try:
+        _state.profiler.dump_stats(stem + '.prof')
+    except TypeError:
+        pass  # nothing was profiled
+    return stem + '.txt'
+
+
+def _write_report_at_exit() -> None:
+    if _state.profiler is None:
+        return
+    _state.enabled = False
+    path = write_report()
+    print(f"Profile report written to {path}")
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+if _env_flag('HUMANIZER_PROFILE'):
+    enable(
+        output_dir=os.environ.get('HUMANIZER_PROFILE_DIR') or None,
+        top=int(os.environ['HUMANIZER_PROFILE_TOP']) if os.environ.get('HUMANIZER_PROFILE_TOP') else None,
+        memory=_env_flag('HUMANIZER_PROFILE_MEMORY')
+    )
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Process-Sharded Similarity Search over Article Embeddings
+
+The embedding matrix is kept in a .npy file that every worker maps with
+mmap, so the rows live once in the page cache no matter how many processes
+read them. Each query batch is split into row-range shards, each worker
+returns a per-shard top-k, and the partial results are merged.
+
+Every worker caps its BLAS thread pool at one thread, so N workers use N
+cores instead of N full BLAS pools competing for them.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from threadpoolctl import ThreadpoolController
+
+import profiling
+from profiling import profiled
+
+# Below this many rows the pool round-trip costs more than the scan itself
+MIN_ROWS_PER_SHARD = 4096
+
+# Rows sampled on open to check the matrix was written by save_matrix
+NORM_CHECK_ROWS = 1024
+NORM_TOLERANCE = 1e-3
+
+# Per-process view of the matrix, set up by _init_worker
+_worker_matrix: Optional[np.ndarray] = None
+_worker_blas_limit = None
+
+_blas: Optional[ThreadpoolController] = None
+
+
+def _blas_controller() -> ThreadpoolController:
+    global _blas
+    if _blas is None:
+        _blas = ThreadpoolController()
+    return _blas
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize rows so a dot product equals cosine similarity
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+@profiled('save_matrix')
+def save_matrix(embeddings, path: str) -> str:
+    """
+    Write normalized float32 embeddings to a .npy file searchable by mmap
+    """
+    np.save(path, normalize_rows(np.atleast_2d(embeddings)))
+    return path if path.endswith('.npy') else path + '.npy'
+
+
+def check_normalized(matrix: np.ndarray, path: str = '') -> None:
+    """
+    Raise ValueError if sampled rows are not unit length (or all-zero)
+    """
+    rows = matrix.shape[0]
+    if rows == 0:
+        return
+    # A strided view reads the sampled rows without copying them
+    sample = matrix[::max(1, rows // NORM_CHECK_ROWS)]
+    norms = np.linalg.norm(sample, axis=-1)
+    if np.any((np.abs(norms - 1.0) > NORM_TOLERANCE) & (norms != 0)):
+        raise ValueError(
+            f"Embedding rows in {path or 'matrix'} are not L2-normalized; "
+            f"write the matrix with save_matrix() before searching it"
+        )
+
+
+def _init_worker(path: str) -> None:
+    global _worker_matrix, _worker_blas_limit
+    profiling.stop_in_child()
+    # Forked workers inherit the parent's BLAS thread count; one thread per
+    # worker keeps the pool from oversubscribing the cores
+    _worker_blas_limit = _blas_controller().limit(limits=1, user_api='blas')
+    _worker_matrix = np.load(path, mmap_mode='r')
+
+
+def _top_k(scores: np.ndarray, k: int, offset: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k columns per row of a (queries x rows) score block, best first
+    """
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(scores.shape[1]), scores.shape).copy()
+    top = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-top, axis=1, kind='stable')
+    return np.take_along_axis(idx, order, axis=1) + offset, np.take_along_axis(top, order, axis=1)
+
+
+def _search_shard(matrix: np.ndarray, start: int, end: int, queries: np.ndarray,
+                  k: int) -> Tuple[np.ndarray, np.ndarray]:
+    scores = queries @ np.asarray(matrix[start:end]).T
+    return _top_k(scores, k, offset=start)
+
+
+def _search_shard_in_worker(start: int, end: int, queries: np.ndarray,
+                            k: int) -> Tuple[np.ndarray, np.ndarray]:
+    return _search_shard(_worker_matrix, start, end, queries, k)
+
+
+def merge_top_k(parts: Sequence[Tuple[np.ndarray, np.ndarray]], k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge per-shard (indices, scores) blocks into a global top-k
+    """
+    indices = np.concatenate([part[0] for part in parts], axis=1)
+    scores = np.concatenate([part[1] for part in parts], axis=1)
+    best, top = _top_k(scores, k)
+    return np.take_along_axis(indices, best, axis=1), top
+
+
+class ShardedSearcher:
+    """
+    Exact cosine top-k search, fanned out across a process pool
+
+    The .npy file must hold L2-normalized rows, as written by save_matrix();
+    a sample of rows is checked on open. Use as a context manager, or call
+    close() to shut the pool down and remove any temporary matrix file.
+    """
+
+    def __init__(self, path: str, workers: Optional[int] = None,
+                 min_rows_per_shard: int = MIN_ROWS_PER_SHARD, _owned_dir: Optional[str] = None):
+        # Registered first so a temporary matrix is removed even if opening
+        # it fails, the searcher is garbage collected, or the process exits
+        # without close()
+        self._cleanup = weakref.finalize(self, shutil.rmtree, _owned_dir, True) if _owned_dir else None
+        self.path = path
+        self.matrix = np.load(path, mmap_mode='r')
+        check_normalized(self.matrix, path)
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.min_rows_per_shard = min_rows_per_shard
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def from_matrix(cls, embeddings, workers: Optional[int] = None, **kwargs) -> 'ShardedSearcher':
+        """
+        Build a searcher from in-memory embeddings
+
+        The matrix is written once to a temporary file (under /dev/shm when
+        available) so workers can map it instead of receiving a copy.
+        """
+        base = '/dev/shm' if os.path.isdir('/dev/shm') else None
+        tmpdir = tempfile.mkdtemp(prefix='article_embeddings_', dir=base)
+        try:
+            path = save_matrix(embeddings, os.path.join(tmpdir, 'embeddings.npy'))
+            return cls(path, workers=workers, _owned_dir=tmpdir, **kwargs)
+        except BaseException:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            raise
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def __enter__(self) -> 'ShardedSearcher':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self.matrix = None
+        if self._cleanup is not None:
+            self._cleanup()
+
+    def _shards(self) -> List[Tuple[int, int]]:
+        rows = len(self)
+        count = max(1, min(self.workers, rows // self.min_rows_per_shard))
+        bounds = np.linspace(0, rows, count + 1, dtype=np.int64)
+        return [(int(bounds[i]), int(bounds[i + 1])) for i in range(count)]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.path,)
+            )
+        return self._pool
+
+    @profiled('ShardedSearcher.search')
+    def search(self, queries, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k rows for each query vector
+
+        Returns (indices, scores), each shaped (num_queries, k), best first.
+        """
+        single = np.ndim(queries) == 1
+        queries = normalize_rows(np.atleast_2d(queries))
+        k = min(k, len(self))
+
+        shards = self._shards()
+        if len(shards) == 1:
+            # Bound BLAS by the worker count here too, so `workers` is the
+            # number of cores used whichever path runs
+            with _blas_controller().limit(limits=self.workers, user_api='blas'):
+                indices, scores = _search_shard(self.matrix, 0, len(self), queries, k)
+        else:
+            pool = self._get_pool()
+            futures = [pool.submit(_search_shard_in_worker, start, end, queries, k) for start, end in shards]
+            indices, scores = merge_top_k([future.result() for future in futures], k)
+
+        if single:
+            return indices[0], scores[0]
+        return indices, scores
+
+
+def main():
+    """
+    Measure batch query throughput over a saved matrix for 1..N workers
+
+    The matrix must have been written by save_matrix().
+    """
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python sharded_search.py <embeddings.npy> [num_queries] [k]")
+        print("The .npy file must be written by save_matrix() (L2-normalized rows)")
+        sys.exit(1)
+
+    path = sys.argv[1]
+    num_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    k = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    matrix = np.load(path, mmap_mode='r')
+    queries = np.random.default_rng(0).standard_normal((num_queries, matrix.shape[1]), dtype=np.float32)
+    print(f"Matrix: {matrix.shape[0]} x {matrix.shape[1]}, {num_queries} queries, k={k}")
+    print("-" * 50)
+
+    # One worker searches in-process with a single BLAS thread, so it is a
+    # true single-core baseline for the speedup column
+    baseline = None
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        with ShardedSearcher(path, workers=workers) as searcher:
+            searcher.search(queries[:1], k)  # warm up the pool
+            started = time.perf_counter()
+            searcher.search(queries, k)
+            elapsed = time.perf_counter() - started
+        throughput = num_queries / elapsed
+        baseline = baseline or throughput
+        print(f"{workers:3d} workers: {throughput:10.1f} queries/s  ({throughput / baseline:.2f}x)")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
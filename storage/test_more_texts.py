@@ -5,6 +5,8 @@ Test with more varied texts to understand ZeroGPT's behavior
 import requests
 import json
 
+from detection_stats import DetectionStats
+
 def test_zerogpt_api():
     """Test the ZeroGPT API with various texts"""
     
@@ -69,6 +71,8 @@ def test_zerogpt_api():
         'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/139.0.0.0 Safari/537.36'
     }
     
+    stats = DetectionStats()
+    
     for test_case in test_texts:
         text = test_case["text"]
         label = test_case["label"]
@@ -91,6 +95,14 @@ def test_zerogpt_api():
                 is_human = data.get('isHuman', 0)
                 feedback = data.get('feedback', '')
                 
+                stats.add(
+                    ai_percentage=ai_percentage,
+                    is_ai=is_human == 0,
+                    text_words=data.get('textWords', 0),
+                    ai_words=data.get('aiWords', 0),
+                    language=data.get('detected_language', '')
+                )
+                
                 print(f"AI Percentage: {ai_percentage}%")
                 print(f"Is Human: {is_human} ({'Human' if is_human == 1 else 'AI'})")
                 print(f"Feedback: {feedback}")
@@ -105,9 +117,16 @@ def test_zerogpt_api():
                     
             else:
                 print(f"❌ FAILED: HTTP {response.status_code}")
+                stats.add_error(f"HTTP {response.status_code}")
                 
         except Exception as e:
             print(f"❌ ERROR: {e}")
+            stats.add_error(str(e))
+    
+    print(f"\n{'='*60}")
+    print("Summary")
+    print(f"{'='*60}")
+    print(stats.format_summary())
 
 if __name__ == "__main__":
     test_zerogpt_api()
@@ -10,10 +10,16 @@ import json
 import time
 from typing import Dict, Any, Optional
 
+from detection_stats import DetectionStats
+from profiling import profiled, span
+
 class ZeroGPTChecker:
-    def __init__(self):
+    def __init__(self, stats: Optional[DetectionStats] = None):
         self.session = requests.Session()
         
+        # Optional streaming aggregate, updated after every check
+        self.stats = stats
+        
         # Real headers from the network analysis
         self.headers = {
             'Accept': 'application/json, text/plain, */*',
@@ -38,10 +44,20 @@ class ZeroGPTChecker:
         self.validate_url = 'https://api.zerogpt.com/api/joc/api/validate'
         self.impression_url = 'https://api.zerogpt.com/api/joc/api/btnImpresson'
     
+    @profiled('check_text')
     def check_text(self, text: str) -> Dict[str, Any]:
         """
         Check text for AI detection using the real ZeroGPT API
         """
+        result = self._detect(text)
+        if self.stats is not None:
+            self.stats.record(result)
+        return result
+    
+    def _detect(self, text: str) -> Dict[str, Any]:
+        """
+        Make the detectText request and parse the response
+        """
         print(f"Checking text (length: {len(text)} characters)...")
         print(f"Text preview: {text[:100]}...")
         print("-" * 50)
@@ -56,12 +72,13 @@ class ZeroGPTChecker:
             print(f"Payload: {json.dumps(payload, indent=2)}")
             
             # Make the request
-            response = self.session.post(
-                self.api_url,
-                json=payload,
-                headers=self.headers,
-                timeout=30
-            )
+            with span('detectText request'):
+                response = self.session.post(
+                    self.api_url,
+                    json=payload,
+                    headers=self.headers,
+                    timeout=30
+                )
             
             print(f"Response Status: {response.status_code}")
             print(f"Response Headers: {dict(response.headers)}")
@@ -95,6 +112,7 @@ class ZeroGPTChecker:
                 'error': str(e)
             }
     
+    @profiled('_parse_result')
     def _parse_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
         """
         Parse the ZeroGPT API response
@@ -171,12 +189,18 @@ class ZeroGPTChecker:
                 print(f"Error: {result['error']}")
             
             time.sleep(2)  # Delay between tests
+        
+        if self.stats is not None:
+            print("\n" + "=" * 60)
+            print("BATCH SUMMARY:")
+            print("=" * 60)
+            print(self.stats.format_summary())
 
 def main():
     """
     Main function to test the ZeroGPT checker
     """
-    checker = ZeroGPTChecker()
+    checker = ZeroGPTChecker(stats=DetectionStats())
     
     print("ZeroGPT AI Detection Checker - Working Version")
     print("=" * 60)